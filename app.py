@@ -1,10 +1,15 @@
 # streamlit_app.py
 import os
+import sys
 import time
-import random
+import threading
+from collections import deque
+from itertools import islice
+import orjson
 import requests
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 
+import numpy as np
 import streamlit as st
 import plotly.graph_objects as go
 import streamlit.components.v1 as components
@@ -54,7 +59,10 @@ body { background-color: var(--brand-bg); }
   background-color: var(--brand-card); border: 1px solid rgba(255,255,255,0.08);
   border-radius: 14px; padding: 16px; color: var(--brand-text);
 }
+.card + .card, .card + .section-title { margin-top: 8px; }
 .footer { color: var(--brand-muted); font-size: 12px; padding-top: 8px; text-align: right; }
+.footer-row { display: flex; gap: 1rem; }
+.footer-row .footer { flex: 1; }
 .pulse-dot {
   width: 12px; height: 12px; border-radius: 50%;
   background-color: #22d3ee; display: inline-block; margin-right: 6px;
@@ -82,14 +90,48 @@ document.addEventListener("DOMContentLoaded", function(){
 </script>
 """
 
-st.markdown(BRAND_CSS, unsafe_allow_html=True)
+# Refresh countdown runs in the browser. %(period)d is the refresh interval in
+# seconds; %(run)d changes on every full rerun so the iframe is remounted and the
+# countdown restarts together with the fragment's run_every timer.
+COUNTDOWN_JS = """
+<!-- run %(run)d -->
+<div id="countdown" style="color:#94a3b8;font:12px sans-serif;text-align:right;"></div>
+<script>
+const period = %(period)d;
+let left = period;
+const el = document.getElementById("countdown");
+function tick(){
+  el.textContent = "Refreshing in " + left + " seconds…";
+  left = left > 1 ? left - 1 : period;
+}
+tick();
+setInterval(tick, 1000);
+</script>
+"""
+
+HEADER_HTML = (
+    "<div class='header-strip'>"
+    "<div><span class='pulse-dot'></span><span class='header-title'>PulseGuard SOS – Live Wearable Dashboard</span>"
+    "<div class='header-sub'>Real-time vitals • Alerts • Care insights</div></div>"
+    "<div class='badge badge-blue'>SYNC ACTIVE</div>"
+    "</div>"
+)
+
+# Static styling + header go out as one markdown element on full reruns only;
+# fragment ticks never reach this code. They are not gated behind a
+# session_state flag because Streamlit drops elements a full rerun does not
+# re-emit, which would strip the CSS after the first widget change.
+st.markdown(BRAND_CSS + HEADER_HTML, unsafe_allow_html=True)
 components.html(JS_EFFECTS, height=0)
 
 # -----------------------------
 # Sidebar: data source & thresholds
 # (Put data source selector early so functions can reference them safely)
 # -----------------------------
-st.sidebar.markdown("<div class='section-title'>Synchronization</div>", unsafe_allow_html=True)
+SYNC_TITLE_HTML = "<div class='section-title'>Synchronization</div>"
+MONITORING_TITLE_HTML = "<div class='section-title'>Monitoring controls</div>"
+
+st.sidebar.markdown(SYNC_TITLE_HTML, unsafe_allow_html=True)
 
 data_source = st.sidebar.selectbox(
     "Data source",
@@ -102,9 +144,12 @@ data_url = st.sidebar.text_input(
     value=os.getenv("DATA_URL", ""),
     help="Public HTTPS endpoint returning latest payload. Leave blank for simulation."
 )
+# Resolved once per full rerun; read by every live tick and the footer
+use_http = isinstance(data_source, str) and data_source.startswith("HTTP")
+source_label = "HTTP JSON" if use_http else "Simulated (realistic)"
 
 st.sidebar.markdown("---")
-st.sidebar.markdown("<div class='section-title'>Monitoring controls</div>", unsafe_allow_html=True)
+st.sidebar.markdown(MONITORING_TITLE_HTML, unsafe_allow_html=True)
 
 safe_low = st.sidebar.number_input("Safe BPM low", value=55, step=1)
 safe_high = st.sidebar.number_input("Safe BPM high", value=100, step=1)
@@ -120,12 +165,23 @@ st.sidebar.caption("Tip: Use the HTTP JSON mode to connect your watch/phone comp
 # -----------------------------
 # Session state init (single definition)
 # -----------------------------
+HR_WINDOW_MS = 600_000   # chart shows the last 10 minutes
+HR_BUF_SIZE = 1024    # ring capacity; 10 min at the fastest 2 s refresh is 300 points
+HR_BPM_MAX = int(np.iinfo(np.int16).max)   # largest reading hr_bpm can hold
+HR_CLOCK_SKEW_MS = 2_000   # readings stamped further ahead of the server clock are clamped
+SIM_BATCH = 1024      # simulator ticks drawn per numpy RNG call
+SIM_DRAWS = 8         # uniform draws consumed per simulated payload
+
 def init_state_once():
     ss = st.session_state
-    if "hr_series" not in ss:
-        ss.hr_series = []   # list[(aware datetime, bpm)]
+    if "hr_ts_ms" not in ss:
+        # HR ring buffer as two parallel arrays; hr_n counts every point written
+        ss.hr_ts_ms = np.empty(HR_BUF_SIZE, dtype=np.int64)   # unix epoch ms (UTC)
+        ss.hr_bpm = np.empty(HR_BUF_SIZE, dtype=np.int16)
+        ss.hr_n = 0
+        ss.hr_last_raw = None   # (ts_ms as received, bpm) of the latest reading, for repeat checks
     if "alerts" not in ss:
-        ss.alerts = []      # list[dict]
+        ss.alerts = deque(maxlen=50)   # deque[dict], oldest dropped on append
     if "sleep" not in ss:
         ss.sleep = {"duration_min": None, "quality": None}
     if "fitness" not in ss:
@@ -134,12 +190,101 @@ def init_state_once():
         ss.nutrition = {"hydration_ml": None, "meals": None}
     if "last_sync" not in ss:
         ss.last_sync = None
+    if "sim_buf" not in ss:
+        ss.sim_buf = np.random.default_rng().random((SIM_BATCH, SIM_DRAWS))
+        ss.sim_idx = 0
 
 init_state_once()
 
+# -----------------------------
+# HR ring buffer helpers
+# -----------------------------
+def now_ms() -> int:
+    # Wall-clock epoch ms as a plain int; all window cutoffs compare against this
+    return time.time_ns() // 1_000_000
+
+def hr_ordered():
+    """
+    Returns (ts_ms, bpm) arrays for every stored point, oldest first.
+    """
+    ss = st.session_state
+    n = ss.hr_n
+    if n <= HR_BUF_SIZE:
+        return ss.hr_ts_ms[:n], ss.hr_bpm[:n]
+    head = n % HR_BUF_SIZE
+    return (np.concatenate((ss.hr_ts_ms[head:], ss.hr_ts_ms[:head])),
+            np.concatenate((ss.hr_bpm[head:], ss.hr_bpm[:head])))
+
+def insert_hr_in_order(ts_ms: int, bpm: int):
+    """
+    Slow path for a reading older than the latest one: rewrites the buffer in time
+    order starting at slot 0, dropping the oldest point if the ring is full.
+    """
+    ss = st.session_state
+    ts, vals = hr_ordered()
+    pos = np.searchsorted(ts, ts_ms, side="right")
+    ts = np.insert(ts, pos, ts_ms)
+    vals = np.insert(vals, pos, bpm)
+    if len(ts) > HR_BUF_SIZE:
+        ts, vals = ts[1:], vals[1:]
+        # Next multiple of the capacity: head wraps to slot 0 and hr_n still changes
+        n = (ss.hr_n // HR_BUF_SIZE + 1) * HR_BUF_SIZE
+    else:
+        n = len(ts)
+    ss.hr_ts_ms[:len(ts)] = ts
+    ss.hr_bpm[:len(vals)] = vals
+    ss.hr_n = n
+
+def append_hr(ts_ms: int, bpm: int, skip_repeat: bool = False) -> bool:
+    """
+    Stores a reading, keeping hr_ts_ms in time order so hr_window can binary-search it.
+    Timestamps more than HR_CLOCK_SKEW_MS ahead of the server clock are clamped, so a
+    fast device clock cannot block later readings; late readings are inserted in order,
+    or dropped if already older than the chart window.
+    Returns False only when skip_repeat is set and the reading exactly repeats the
+    previous one (a stuck feed); any other reading is new, whether stored or not.
+    """
+    ss = st.session_state
+    if skip_repeat and ss.hr_last_raw == (ts_ms, bpm):
+        return False
+    ss.hr_last_raw = (ts_ms, bpm)
+
+    now = now_ms()
+    ts_ms = min(ts_ms, now + HR_CLOCK_SKEW_MS)
+    if ss.hr_n and ts_ms < ss.hr_ts_ms[(ss.hr_n - 1) % HR_BUF_SIZE]:
+        if ts_ms >= now - HR_WINDOW_MS:
+            insert_hr_in_order(ts_ms, bpm)
+        return True
+    i = ss.hr_n % HR_BUF_SIZE
+    ss.hr_ts_ms[i] = ts_ms
+    ss.hr_bpm[i] = bpm
+    ss.hr_n += 1
+    return True
+
+def latest_hr(cutoff_ms: int):
+    """
+    Most recent reading, or None if there is none at or after cutoff_ms.
+    """
+    ss = st.session_state
+    if not ss.hr_n:
+        return None
+    last = (ss.hr_n - 1) % HR_BUF_SIZE
+    return int(ss.hr_bpm[last]) if ss.hr_ts_ms[last] >= cutoff_ms else None
+
+def hr_window(cutoff_ms: int):
+    """
+    Returns (times, bpm) arrays, oldest first, for points at or after cutoff_ms.
+    times is a zero-copy datetime64[ms] view of the epoch-ms buffer, ready for Plotly.
+    """
+    ts, bpm = hr_ordered()
+    start = np.searchsorted(ts, cutoff_ms)
+    return ts[start:].view("datetime64[ms]"), bpm[start:]
+
 # -----------------------------
 # Data helpers (UTC-aware)
 # -----------------------------
+ISO_NEEDS_Z_FIXUP = sys.version_info < (3, 11)
+
 def parse_payload(payload: dict):
     """
     Normalizes incoming payload into:
@@ -156,14 +301,17 @@ def parse_payload(payload: dict):
         if isinstance(ts_raw, datetime):
             ts = ts_raw
         elif isinstance(ts_raw, str):
-            # Normalize 'Z' to +00:00 and parse
-            ts = datetime.fromisoformat(ts_raw.replace("Z", "+00:00"))
+            # fromisoformat accepts a trailing 'Z' from Python 3.11 on
+            if ISO_NEEDS_Z_FIXUP and ts_raw.endswith("Z"):
+                ts_raw = ts_raw[:-1] + "+00:00"
+            ts = datetime.fromisoformat(ts_raw)
         else:
             ts = datetime.now(timezone.utc)
         if ts.tzinfo is None:
             ts = ts.replace(tzinfo=timezone.utc)
-        else:
-            # normalize to UTC timezone object
+        elif ts.tzinfo is not timezone.utc:
+            # normalize to UTC timezone object; ISO-Z strings already parse to
+            # timezone.utc on 3.11+ and skip this
             ts = ts.astimezone(timezone.utc)
     except Exception:
         ts = datetime.now(timezone.utc)
@@ -176,56 +324,131 @@ def parse_payload(payload: dict):
 
     return ts, hr, sleep, fitness, nutrition, emergency
 
-def fetch_http_json(url: str):
-    if not url:
-        return None
+def new_http_session():
+    """
+    Keep-alive session so each poll reuses the pooled TCP/TLS connection.
+    requests.Session is not thread-safe, so each poller owns its own.
+    """
+    s = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=4)
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    return s
+
+def fetch_http_body(session: requests.Session, url: str):
+    """
+    Returns (raw body, None) on success or (None, error message) on failure.
+    Runs on the poller thread, so it must not call into Streamlit.
+    """
     try:
-        r = requests.get(url, timeout=4)
+        r = session.get(url, timeout=4)
         if r.status_code == 200:
-            return r.json()
+            return r.content, None
         else:
-            st.sidebar.warning(f"HTTP status {r.status_code} from data URL")
-            return None
+            return None, f"HTTP status {r.status_code} from data URL"
     except Exception as e:
-        st.sidebar.error(f"Fetch error: {e}")
-        return None
+        return None, f"Fetch error: {e}"
+
+POLLER_IDLE_SEC = 60   # poller thread exits once no session has read it for this long
+
+@st.cache_resource(max_entries=16)
+def feed_poller(url: str):
+    """
+    Shared poller state for one feed URL; every session watching it reads the same slot.
+    "latest" holds the last (body, error) pair and is replaced in a single assignment.
+    "interval" is the poll period asked for by the most recent reader.
+    "session" belongs to the running thread and is closed when that thread exits; an
+    evicted entry's thread still idles out and closes its session.
+    """
+    return {"latest": (None, None), "last_read": time.monotonic(), "interval": None,
+            "thread": None, "lock": threading.Lock(), "session": None}
+
+def poll_loop(poller: dict, url: str):
+    session = poller["session"]
+    try:
+        while time.monotonic() - poller["last_read"] < POLLER_IDLE_SEC:
+            time.sleep(poller["interval"])
+            poller["latest"] = fetch_http_body(session, url)
+    finally:
+        session.close()
+
+def latest_http_body(url: str, interval: int):
+    """
+    Non-blocking read of the most recent poll for url, (re)starting its thread if needed.
+    The first read after a (re)start fetches synchronously so it never sees a stale body.
+    """
+    if not url:
+        return None, None
+    poller = feed_poller(url)
+    poller["interval"] = interval
+    poller["last_read"] = time.monotonic()
+    with poller["lock"]:
+        t = poller["thread"]
+        if t is None or not t.is_alive():
+            # The previous thread closed its session on exit; start with a fresh one
+            poller["session"] = new_http_session()
+            poller["latest"] = fetch_http_body(poller["session"], url)
+            t = threading.Thread(target=poll_loop, args=(poller, url),
+                                 name="feed-poller", daemon=True)
+            poller["thread"] = t
+            t.start()
+    return poller["latest"]
+
+ISO_Z_FORMAT = "%Y-%m-%dT%H:%M:%SZ"   # UTC timestamps, whole seconds
+
+SLEEP_OPTIONS = [
+    {"duration_min": 0, "quality": "—"},
+    {"duration_min": 360, "quality": "fair"},
+    {"duration_min": 420, "quality": "good"},
+    {"duration_min": 480, "quality": "excellent"},
+]
+
+def next_sim_draws():
+    """
+    Pops one row of uniform [0, 1) draws from the batched RNG buffer, refilling it when exhausted.
+    """
+    ss = st.session_state
+    if ss.sim_idx >= SIM_BATCH:
+        ss.sim_buf = np.random.default_rng().random((SIM_BATCH, SIM_DRAWS))
+        ss.sim_idx = 0
+    row = ss.sim_buf[ss.sim_idx].tolist()
+    ss.sim_idx += 1
+    return row
+
+def uniform_int(u: float, low: int, high: int) -> int:
+    # Maps a [0, 1) draw onto low..high inclusive, like random.randint
+    return int(low) + int(u * (int(high) - int(low) + 1))
 
 def simulate_payload_dict():
     """
     Returns a payload dictionary (timestamp as ISO Z string) to match parse_payload expectations.
     """
     now = datetime.now(timezone.utc)
+    u_circ, u_spike, u_hr, u_sleep, u_steps, u_cal, u_hyd, u_meals = next_sim_draws()
 
-    circadian = 72 + int(4 * (random.random() - 0.5))
-    r = random.random()
-    if r < 0.03:
-        hr = random.randint(alert_high, alert_high + 20)
-    elif r < 0.06:
-        hr = random.randint(max(30, alert_low - 10), alert_low)
+    circadian = 72 + int(4 * (u_circ - 0.5))
+    if u_spike < 0.03:
+        hr = uniform_int(u_hr, alert_high, alert_high + 20)
+    elif u_spike < 0.06:
+        hr = uniform_int(u_hr, max(30, alert_low - 10), alert_low)
     else:
-        hr = circadian + random.randint(-3, 3)
+        hr = circadian + uniform_int(u_hr, -3, 3)
 
-    sleep_options = [
-        {"duration_min": 0, "quality": "—"},
-        {"duration_min": 360, "quality": "fair"},
-        {"duration_min": 420, "quality": "good"},
-        {"duration_min": 480, "quality": "excellent"},
-    ]
-    sleep = random.choice(sleep_options)
+    sleep = dict(SLEEP_OPTIONS[int(u_sleep * len(SLEEP_OPTIONS))])
 
     fitness = {
-        "steps": random.randint(800, 12000),
-        "calories": random.randint(180, 650)
+        "steps": uniform_int(u_steps, 800, 12000),
+        "calories": uniform_int(u_cal, 180, 650)
     }
     nutrition = {
-        "hydration_ml": random.randint(600, 2500),
-        "meals": random.randint(1, 4)
+        "hydration_ml": uniform_int(u_hyd, 600, 2500),
+        "meals": uniform_int(u_meals, 1, 4)
     }
 
     emergency_active = hr >= alert_high or hr <= alert_low
 
     payload = {
-        "timestamp": now.isoformat().replace("+00:00", "Z"),
+        "timestamp": now.strftime(ISO_Z_FORMAT),
         "heart_rate_bpm": hr,
         "sleep": sleep,
         "fitness": fitness,
@@ -241,43 +464,52 @@ def simulate_payload_dict():
 # State updater (single, robust)
 # -----------------------------
 def update_state_from_source_once():
-    # Decide source
-    if isinstance(data_source, str) and data_source.startswith("HTTP"):
-        payload = fetch_http_json(data_url)
-        if payload is None:
-            payload = simulate_payload_dict()
-    else:
-        payload = simulate_payload_dict()
-
-    ts, hr, sleep, fitness, nutrition, emergency = parse_payload(payload)
-
-    # Update HR series safely (aware datetimes)
+    # Decide source (simulation is the fallback)
+    parsed = None
+    if use_http:
+        raw, error = latest_http_body(data_url, refresh_sec)
+        if error:
+            st.warning(error)
+        if raw is not None:
+            try:
+                payload = orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                payload = None
+            if payload is None:
+                st.error("Fetch error: data URL did not return valid JSON")
+            else:
+                parsed = parse_payload(payload)
+    from_http = parsed is not None
+    if parsed is None:
+        parsed = parse_payload(simulate_payload_dict())
+
+    ts, hr, sleep, fitness, nutrition, emergency = parsed
+
+    # Append to the HR ring buffer (old points age out of the chart window)
     if hr is not None:
         try:
             hr_int = int(hr)
         except Exception:
             # If can't convert, skip
             hr_int = None
+        if hr_int is not None and not 0 <= hr_int <= HR_BPM_MAX:
+            # Out of range for the int16 buffer; skip rather than wrap
+            hr_int = None
 
-        if hr_int is not None:
-            st.session_state.hr_series.append((ts, hr_int))
-
-            cutoff = datetime.now(timezone.utc) - timedelta(minutes=10)
-            # Keep only tuples with aware datetimes and recent enough
-            st.session_state.hr_series = [
-                p for p in st.session_state.hr_series
-                if isinstance(p, tuple) and len(p) == 2 and isinstance(p[0], datetime) and p[0].tzinfo is not None and p[0] >= cutoff
-            ]
-
+        # A repeated HTTP reading (stuck feed) is not stored or alerted again; any
+        # other out-of-bounds reading alerts even if it is too old to be charted.
+        # Simulated timestamps are whole seconds, so equal ones are not repeats.
+        ts_ms = int(ts.timestamp() * 1000)
+        if hr_int is not None and append_hr(ts_ms, hr_int, skip_repeat=from_http):
             # Log alert if out of bounds
             if hr_int >= alert_high or hr_int <= alert_low:
                 st.session_state.alerts.append({
-                    "time": ts.isoformat().replace("+00:00", "Z"),
+                    "time": ts.strftime(ISO_Z_FORMAT),
+                    "time_ms": ts_ms,
                     "type": "EMERGENCY",
                     "value": int(hr_int),
                     "message": f"Heart rate {hr_int} bpm out of bounds"
                 })
-                st.session_state.alerts = st.session_state.alerts[-50:]
 
     # Update panels (preserve previous values if incoming missing keys)
     st.session_state.sleep = {
@@ -294,167 +526,186 @@ def update_state_from_source_once():
     }
     st.session_state.last_sync = datetime.now(timezone.utc)
 
-# One update per load (safe)
-update_state_from_source_once()
-
 # -----------------------------
-# Header
+# Chart helpers
 # -----------------------------
-st.markdown(
-    "<div class='header-strip'>"
-    "<div><span class='pulse-dot'></span><span class='header-title'>PulseGuard SOS – Live Wearable Dashboard</span>"
-    "<div class='header-sub'>Real-time vitals • Alerts • Care insights</div></div>"
-    "<div class='badge badge-blue'>SYNC ACTIVE</div>"
-    "</div>",
-    unsafe_allow_html=True
-)
-
-# -----------------------------
-# Top metrics row
-# -----------------------------
-m1, m2, m3 = st.columns([1, 1, 1])
-with m1:
-    current_bpm = st.session_state.hr_series[-1][1] if st.session_state.hr_series else None
-    display_bpm = "—" if current_bpm is None else f"{current_bpm} bpm"
-    st.markdown("<div class='metric-card'><div class='metric-label'>Current Heart Rate</div>"
-                f"<div class='metric-value'>{display_bpm}</div></div>",
-                unsafe_allow_html=True)
-with m2:
-    last_sync = st.session_state.last_sync
-    last_sync_str = last_sync.astimezone(timezone.utc).strftime("%H:%M:%S UTC") if last_sync else "—"
-    st.markdown("<div class='metric-card'><div class='metric-label'>Last Sync</div>"
-                f"<div class='metric-value'>{last_sync_str}</div></div>", unsafe_allow_html=True)
-with m3:
-    ten_min_ago = datetime.now(timezone.utc) - timedelta(minutes=10)
-    recent_alerts = 0
-    for a in st.session_state.alerts:
-        try:
-            at = datetime.fromisoformat(a["time"].replace("Z", "+00:00"))
-            if at >= ten_min_ago:
-                recent_alerts += 1
-        except Exception:
-            continue
-    st.markdown("<div class='metric-card'><div class='metric-label'>Alerts (10 min)</div>"
-                f"<div class='metric-value'>{recent_alerts}</div></div>", unsafe_allow_html=True)
-
-# -----------------------------
-# Heart rate chart
-# -----------------------------
-st.markdown("<div class='section-title'>Heart rate (live)</div>", unsafe_allow_html=True)
-times = [t for (t, _) in st.session_state.hr_series]
-values = [v for (_, v) in st.session_state.hr_series]
-
-fig = go.Figure()
-
-if times:
-    # Safe band polygon based on first and last time
-    fig.add_trace(go.Scatter(
-        x=[times[0], times[-1], times[-1], times[0]],
-        y=[safe_low, safe_low, safe_high, safe_high],
-        fill="toself",
-        fillcolor="rgba(16,185,129,0.12)",
-        line=dict(color="rgba(0,0,0,0)"),
-        hoverinfo="skip",
-        name="Safe range"
+@st.cache_resource(max_entries=16)
+def hr_layout(safe_low: int, safe_high: int, alert_low: int, alert_high: int):
+    """
+    HR chart layout with the safe band and alert threshold lines as layout shapes,
+    built once per threshold set. Shared between sessions, so callers must not mutate it.
+    """
+    def threshold(y, text, yanchor):
+        line = dict(type="line", xref="x domain", x0=0, x1=1, yref="y", y0=y, y1=y,
+                    line=dict(color="red", dash="dot"))
+        label = dict(text=text, xref="x domain", x=1, xanchor="right", yref="y", y=y,
+                     yanchor=yanchor, showarrow=False)
+        return line, label
+
+    high_line, high_label = threshold(alert_high, f"Alert high {alert_high} bpm", "bottom")
+    low_line, low_label = threshold(alert_low, f"Alert low {alert_low} bpm", "top")
+    safe_band = dict(type="rect", xref="x domain", x0=0, x1=1, yref="y", y0=safe_low, y1=safe_high,
+                     fillcolor="rgba(16,185,129,0.12)", line=dict(width=0), layer="below")
+    return dict(
+        height=320,
+        margin=dict(l=30, r=20, t=30, b=30),
+        xaxis=dict(title="Time (last 10 min)"),
+        yaxis=dict(title="BPM"),
+        template="plotly_dark",
+        paper_bgcolor="#0b1220",
+        plot_bgcolor="#0b1220",
+        font=dict(color="#e5e7eb"),
+        shapes=[safe_band, high_line, low_line],
+        annotations=[high_label, low_label],
+        # Constant uirevision: each tick is applied by Plotly.react as a data
+        # update on the mounted chart, keeping the user's zoom/pan and legend state.
+        uirevision="hr"
+    )
+
+def build_hr_figure():
+    """
+    Empty HR figure skeleton with the live line as its only trace.
+    Ticks only assign x/y on it; see set_hr_figure_data.
+    """
+    fig = go.Figure(layout=hr_layout(safe_low, safe_high, alert_low, alert_high))
+
+    # Live line, WebGL-rendered so restyles stay cheap as the window fills
+    fig.add_trace(go.Scattergl(
+        x=[],
+        y=[],
+        mode="lines+markers",
+        line=dict(color="#22d3ee", width=3),
+        marker=dict(size=4),
+        name="BPM"
     ))
+    return fig
 
-# Live line
-fig.add_trace(go.Scatter(
-    x=times,
-    y=values,
-    mode="lines+markers",
-    line=dict(color="#22d3ee", width=3),
-    marker=dict(size=5),
-    name="BPM"
-))
-
-# Threshold lines
-fig.add_hline(y=alert_high, line=dict(color="red", dash="dot"),
-              annotation_text=f"Alert high {alert_high} bpm", annotation_position="top right")
-fig.add_hline(y=alert_low, line=dict(color="red", dash="dot"),
-              annotation_text=f"Alert low {alert_low} bpm", annotation_position="bottom right")
-
-fig.update_layout(
-    height=320,
-    margin=dict(l=30, r=20, t=30, b=30),
-    xaxis_title="Time (last 10 min)",
-    yaxis_title="BPM",
-    template="plotly_dark",
-    paper_bgcolor="#0b1220",
-    plot_bgcolor="#0b1220",
-    font=dict(color="#e5e7eb")
-)
-st.plotly_chart(fig, use_container_width=True)
+def set_hr_figure_data(fig, times, values):
+    line = fig.data[0]
+    line.x = times
+    line.y = values
+
+# Static panel markup, shared by every tick
+NORMAL_STATUS_HTML = ("<div class='section-title'>Emergency status</div>"
+                      "<div class='card'><span class='badge badge-green'>Normal</span><br/><br/>"
+                      "Vitals within safe range. Monitoring continues.</div>")
+NO_ALERTS_HTML = "<div class='card'>No alerts in the current session.</div>"
 
 # -----------------------------
-# Emergency + panels row
+# Live section: metrics, chart and panels rerun on their own
+# every refresh_sec as a fragment, so the sidebar, CSS and header
+# are not rebuilt on each tick.
 # -----------------------------
-c1, c2, c3, c4 = st.columns([1.5, 1, 1, 1])
-with c1:
-    st.markdown("<div class='section-title'>Emergency status</div>", unsafe_allow_html=True)
-    current_bpm_val = st.session_state.hr_series[-1][1] if st.session_state.hr_series else None
-    emergency_active = current_bpm_val is not None and (current_bpm_val >= alert_high or current_bpm_val <= alert_low)
-    if emergency_active:
-        st.markdown("<div class='card'><span class='badge badge-red'>SOS ACTIVE</span><br/><br/>"
-                    f"<strong>Reason:</strong> Heart rate {current_bpm_val} bpm out of bounds.<br/>"
-                    "Alerts sent to registered contacts.</div>", unsafe_allow_html=True)
-    else:
-        st.markdown("<div class='card'><span class='badge badge-green'>Normal</span><br/><br/>"
-                    "Vitals within safe range. Monitoring continues.</div>", unsafe_allow_html=True)
-
-    # Recent alerts list
-    if st.session_state.alerts:
-        st.markdown("<div class='section-title'>Recent alerts</div>", unsafe_allow_html=True)
-        for a in reversed(st.session_state.alerts[-5:]):
-            st.markdown(f"<div class='card' style='margin-bottom:8px'>"
-                        f"<strong>{a['type']}</strong> • {a['message']}<br/>"
-                        f"<span class='badge badge-blue'>{a['time']}</span></div>", unsafe_allow_html=True)
-    else:
-        st.markdown("<div class='card'>No alerts in the current session.</div>", unsafe_allow_html=True)
-
-with c2:
-    st.markdown("<div class='section-title'>Sleep</div>", unsafe_allow_html=True)
-    sl = st.session_state.sleep
-    st.markdown(f"<div class='card'>"
-                f"Duration: <strong>{sl['duration_min'] if sl['duration_min'] is not None else '—'} min</strong><br/>"
-                f"Quality: <strong>{sl['quality'] if sl['quality'] else '—'}</strong></div>", unsafe_allow_html=True)
-
-with c3:
-    st.markdown("<div class='section-title'>Fitness</div>", unsafe_allow_html=True)
-    ft = st.session_state.fitness
-    st.markdown(f"<div class='card'>"
-                f"Steps: <strong>{ft['steps'] if ft['steps'] is not None else '—'}</strong><br/>"
-                f"Calories: <strong>{ft['calories'] if ft['calories'] is not None else '—'}</strong></div>", unsafe_allow_html=True)
-
-with c4:
-    st.markdown("<div class='section-title'>Nutrition</div>", unsafe_allow_html=True)
-    nt = st.session_state.nutrition
-    st.markdown(f"<div class='card'>"
-                f"Hydration: <strong>{nt['hydration_ml'] if nt['hydration_ml'] is not None else '—'} ml</strong><br/>"
-                f"Meals: <strong>{nt['meals'] if nt['meals'] is not None else '—'}</strong></div>", unsafe_allow_html=True)
+@st.fragment(run_every=refresh_sec if auto_refresh else None)
+def live_tick():
+    update_state_from_source_once()
+    cutoff_ms = now_ms() - HR_WINDOW_MS
+
+    # -----------------------------
+    # Top metrics row
+    # -----------------------------
+    m1, m2, m3 = st.columns([1, 1, 1])
+    with m1:
+        current_bpm = latest_hr(cutoff_ms)
+        display_bpm = "—" if current_bpm is None else f"{current_bpm} bpm"
+        st.markdown("<div class='metric-card'><div class='metric-label'>Current Heart Rate</div>"
+                    f"<div class='metric-value'>{display_bpm}</div></div>",
+                    unsafe_allow_html=True)
+    with m2:
+        last_sync = st.session_state.last_sync
+        last_sync_str = last_sync.astimezone(timezone.utc).strftime("%H:%M:%S UTC") if last_sync else "—"
+        st.markdown("<div class='metric-card'><div class='metric-label'>Last Sync</div>"
+                    f"<div class='metric-value'>{last_sync_str}</div></div>", unsafe_allow_html=True)
+    with m3:
+        recent_alerts = sum(1 for a in st.session_state.alerts if a.get("time_ms", 0) >= cutoff_ms)
+        st.markdown("<div class='metric-card'><div class='metric-label'>Alerts (10 min)</div>"
+                    f"<div class='metric-value'>{recent_alerts}</div></div>", unsafe_allow_html=True)
+
+    # -----------------------------
+    # Heart rate chart
+    # -----------------------------
+    st.markdown("<div class='section-title'>Heart rate (live)</div>", unsafe_allow_html=True)
+    times, values = hr_window(cutoff_ms)
+
+    # The figure skeleton lives in session state and is rebuilt only when a
+    # threshold moves; ticks just swap the trace arrays. When no point was added
+    # or aged out the figure is untouched, and the identical chart message goes
+    # to the browser as a cached-message reference.
+    ss = st.session_state
+    layout_key = (safe_low, safe_high, alert_low, alert_high)
+    if ss.get("hr_fig_layout_key") != layout_key:
+        ss.hr_fig = build_hr_figure()
+        ss.hr_fig_layout_key = layout_key
+        ss.hr_fig_data_key = None
+    data_key = (ss.hr_n, len(times))
+    if ss.hr_fig_data_key != data_key:
+        set_hr_figure_data(ss.hr_fig, times, values)
+        ss.hr_fig_data_key = data_key
+    st.plotly_chart(ss.hr_fig, use_container_width=True)
+
+    # -----------------------------
+    # Emergency + panels row
+    # -----------------------------
+    # Each column is emitted as one markdown element (title + card(s)), so the
+    # row costs four elements per tick instead of up to fourteen.
+    c1, c2, c3, c4 = st.columns([1.5, 1, 1, 1])
+    with c1:
+        current_bpm_val = latest_hr(cutoff_ms)
+        emergency_active = current_bpm_val is not None and (current_bpm_val >= alert_high or current_bpm_val <= alert_low)
+        if emergency_active:
+            status_html = ("<div class='section-title'>Emergency status</div>"
+                           "<div class='card'><span class='badge badge-red'>SOS ACTIVE</span><br/><br/>"
+                           f"<strong>Reason:</strong> Heart rate {current_bpm_val} bpm out of bounds.<br/>"
+                           "Alerts sent to registered contacts.</div>")
+        else:
+            status_html = NORMAL_STATUS_HTML
+
+        # Recent alerts list
+        if st.session_state.alerts:
+            alerts_html = "<div class='section-title'>Recent alerts</div>" + "".join(
+                f"<div class='card'>"
+                f"<strong>{a['type']}</strong> • {a['message']}<br/>"
+                f"<span class='badge badge-blue'>{a['time']}</span></div>"
+                for a in islice(reversed(st.session_state.alerts), 5)
+            )
+        else:
+            alerts_html = NO_ALERTS_HTML
+        st.markdown(status_html + alerts_html, unsafe_allow_html=True)
+
+    with c2:
+        sl = st.session_state.sleep
+        st.markdown("<div class='section-title'>Sleep</div>"
+                    f"<div class='card'>"
+                    f"Duration: <strong>{sl['duration_min'] if sl['duration_min'] is not None else '—'} min</strong><br/>"
+                    f"Quality: <strong>{sl['quality'] if sl['quality'] else '—'}</strong></div>", unsafe_allow_html=True)
+
+    with c3:
+        ft = st.session_state.fitness
+        st.markdown("<div class='section-title'>Fitness</div>"
+                    f"<div class='card'>"
+                    f"Steps: <strong>{ft['steps'] if ft['steps'] is not None else '—'}</strong><br/>"
+                    f"Calories: <strong>{ft['calories'] if ft['calories'] is not None else '—'}</strong></div>", unsafe_allow_html=True)
+
+    with c4:
+        nt = st.session_state.nutrition
+        st.markdown("<div class='section-title'>Nutrition</div>"
+                    f"<div class='card'>"
+                    f"Hydration: <strong>{nt['hydration_ml'] if nt['hydration_ml'] is not None else '—'} ml</strong><br/>"
+                    f"Meals: <strong>{nt['meals'] if nt['meals'] is not None else '—'}</strong></div>", unsafe_allow_html=True)
+
+live_tick()
 
 # -----------------------------
-# Footer + refresh logic
+# Footer
 # -----------------------------
-left, mid, right = st.columns([1,1,1])
-with left:
-    st.markdown("<div class='footer'>Data source: "
-                f"{'HTTP JSON' if isinstance(data_source, str) and data_source.startswith('HTTP') else 'Simulated (realistic)'}"
-                "</div>", unsafe_allow_html=True)
-with mid:
-    st.markdown("<div class='footer'>Safe range: "
-                f"{safe_low}–{safe_high} bpm • Alerts at {alert_low}/{alert_high} bpm"
-                "</div>", unsafe_allow_html=True)
-with right:
-    st.markdown("<div class='footer'>Refresh interval: "
-                f"{refresh_sec}s • Auto: {'ON' if auto_refresh else 'OFF'}"
-                "</div>", unsafe_allow_html=True)
-
-# Safe auto-refresh (toggle + countdown), avoids infinite loops if disabled
+# One markdown element laid out with flexbox instead of three st.columns cells
+st.markdown("<div class='footer-row'>"
+            f"<div class='footer'>Data source: {source_label}</div>"
+            f"<div class='footer'>Safe range: {safe_low}–{safe_high} bpm • Alerts at {alert_low}/{alert_high} bpm</div>"
+            f"<div class='footer'>Refresh interval: {refresh_sec}s • Auto: {'ON' if auto_refresh else 'OFF'}</div>"
+            "</div>", unsafe_allow_html=True)
+
+# Countdown to the next live_tick() run, ticking client-side instead of
+# sleeping on the script thread
 if auto_refresh:
-    countdown_placeholder = st.empty()
-    for i in range(refresh_sec, 0, -1):
-        countdown_placeholder.markdown(f"<div class='footer'>Refreshing in {i} seconds…</div>", unsafe_allow_html=True)
-        time.sleep(1)
-    # Trigger a safe rerun once to refresh the UI with new data
-    st.experimental_rerun()
+    components.html(COUNTDOWN_JS % {"period": refresh_sec, "run": now_ms()}, height=24)